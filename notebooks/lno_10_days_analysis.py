@@ -78,7 +78,7 @@ def _(df, mo):
 @app.cell
 def _(datetime_picker, diffraction_order, mo, pd):
     start_date, end_date = [
-        pd.Timestamp.fromtimestamp(_v) for _v in datetime_picker.value
+        pd.Timestamp.fromtimestamp(_v, tz="UTC") for _v in datetime_picker.value
     ]
 
     date_fmt = f"""**Dates**
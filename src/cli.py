@@ -5,6 +5,7 @@ from typing import Annotated, List, Optional
 import typer
 
 from src import main
+from src.settings import configure_logging
 
 app = typer.Typer(pretty_exceptions_show_locals=False)
 
@@ -13,6 +14,7 @@ class FileFormat(str, Enum):
     SHP = "shp"
     GEOJSON = "geosjon"
     GPKG = "gpkg"
+    PARQUET = "parquet"
     OTHER = "other"
 
 
@@ -27,6 +29,7 @@ def callback():
     """
     CLI utility for the STAC converter
     """
+    configure_logging()
 
 
 @app.command()
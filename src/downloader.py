@@ -7,10 +7,10 @@ from urllib.parse import urlparse
 
 import httpx
 import pandas as pd
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 from tqdm.rich import tqdm
 
-from src.settings import create_logger
+from src.settings import DEFAULT_CACHE_FOLDER, create_logger
 
 log = create_logger(__name__)
 
@@ -75,28 +75,68 @@ class WktDownloader:
         "uranus",
         "neptune",
     ]
+    # How long a downloaded page is reused, in seconds
+    CACHE_TTL = 24 * 60 * 60
+
+    def __init__(self, cache_folder: Path | None = None):
+        if cache_folder is None:
+            cache_folder = DEFAULT_CACHE_FOLDER / "wkt"
+        self.cache_folder = cache_folder
+
+    def is_cached(self, cache_file: Path) -> bool:
+        return (
+            cache_file.exists()
+            and time.time() - cache_file.stat().st_mtime < self.CACHE_TTL
+        )
 
     @staticmethod
-    def download_html_contents(url: str) -> BeautifulSoup:
-        response = httpx.get(url)
+    def download_html_contents(client: httpx.Client, url: str) -> bytes:
+        """Downloads the raw page at `url`"""
+        response = client.get(url)
         response.raise_for_status()
-        return BeautifulSoup(response.content, "html.parser")
+        return response.content
+
+    @staticmethod
+    def html_table_to_dataframe(table: Tag) -> pd.DataFrame:
+        """Reads the cells of an already parsed HTML table, header included"""
+        columns = [th.get_text().strip() for th in table.find_all("th")]
+        rows = [
+            [td.get_text().strip() for td in tr.find_all("td")]
+            for tr in table.find_all("tr")
+        ]
+        return pd.DataFrame.from_records([row for row in rows if row], columns=columns)
 
     def local_download(self, output_file: Path):
         big_df = []
 
-        for planet in tqdm(self.PLANETS):
-            soup = self.download_html_contents(self.BASE_URL.format(planet=planet))
-            planet_wkts = soup.find("table")
-            if planet_wkts is not None:
-                df = pd.read_html(planet_wkts.prettify())[0]
-                df["created_at"] = df["created_at"].apply(pd.to_datetime)
-                big_df.append(df)
-            else:
-                log.error(
-                    f"Couldn't download WKT2 info for {planet} at {self.BASE_URL.format(planet=planet)}"
-                )
-            time.sleep(2)
+        # All pages come from the same host, so a single connection is kept alive
+        with httpx.Client(limits=httpx.Limits(max_keepalive_connections=1)) as client:
+            for planet in tqdm(self.PLANETS):
+                cache_file = self.cache_folder / f"{planet}.html"
+                is_cached = self.is_cached(cache_file)
+                if is_cached:
+                    log.info(f"Using cached WKT2 info for {planet} from {cache_file}")
+                    contents = cache_file.read_bytes()
+                else:
+                    contents = self.download_html_contents(
+                        client, self.BASE_URL.format(planet=planet)
+                    )
+                    time.sleep(2)
+                planet_wkts = BeautifulSoup(contents, "html.parser").find("table")
+                if planet_wkts is not None:
+                    # Only pages with the expected table are kept for the next runs
+                    if not is_cached:
+                        cache_file.parent.mkdir(parents=True, exist_ok=True)
+                        cache_file.write_bytes(contents)
+                    df = self.html_table_to_dataframe(planet_wkts)
+                    df["created_at"] = pd.to_datetime(
+                        df["created_at"], format="ISO8601", cache=True
+                    )
+                    big_df.append(df)
+                else:
+                    log.error(
+                        f"Couldn't download WKT2 info for {planet} at {self.BASE_URL.format(planet=planet)}"
+                    )
 
         big_df = pd.concat(big_df)
         big_df.to_csv(output_file, index=None)
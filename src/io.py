@@ -1,6 +1,13 @@
+import os
+import shutil
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from itertools import chain
 from pathlib import Path
 from typing import Iterator
 
+import orjson
+from pystac.stac_io import DefaultStacIO
+
 from src.downloader import Downloader
 from src.settings import DEFAULT_INPUT_FOLDER, DEFAULT_OUTPUT_FOLDER, create_logger
 
@@ -25,25 +32,26 @@ class IoHandler:
         self.input_folder = input_folder
         self.output_folder = output_folder
 
+    @staticmethod
+    def _is_empty(folder: Path) -> bool:
+        """Only looks for a first entry, a missing folder counts as empty"""
+        try:
+            with os.scandir(folder) as entries:
+                return next(entries, None) is None
+        except FileNotFoundError:
+            return True
+
     def count_input_elements(self) -> int:
-        count = 0
-        for _, dirs, files in self.input_folder.walk(on_error=print):
-            count += len(dirs)
-            count += len(files)
-        return count
+        return sum(1 for _ in self.input_folder.rglob("*"))
 
     def count_output_elements(self) -> int:
-        count = 0
-        for _, dirs, files in self.output_folder.walk(on_error=print):
-            count += len(dirs)
-            count += len(files)
-        return count
+        return sum(1 for _ in self.output_folder.rglob("*"))
 
     def is_input_folder_empty(self) -> bool:
-        return self.count_input_elements() == 0
+        return self._is_empty(self.input_folder)
 
     def is_output_folder_empty(self) -> bool:
-        return self.count_output_elements() == 0
+        return self._is_empty(self.output_folder)
 
     def show_input_folder(self):
         for root, dirs, files in self.input_folder.walk(on_error=print):
@@ -62,13 +70,82 @@ class IoHandler:
     def all_input_files_from_ext(self, extension: str) -> Iterator[Path]:
         return self.input_folder.rglob(f"*.{extension}")
 
+    def all_input_files_from_exts(self, *extensions: str) -> Iterator[Path]:
+        """
+        Walks the input folder only once for all the given `extensions`.
+
+        Files are grouped by extension, in the order of `extensions`.
+        """
+        files = {f".{extension}": [] for extension in extensions}
+        for path in self.input_folder.rglob("*"):
+            if path.suffix in files and path.is_file():
+                files[path.suffix].append(path)
+        return chain.from_iterable(files.values())
+
     def all_output_files_from_ext(self, extension: str) -> Iterator[Path]:
         return self.output_folder.rglob(f"*.{extension}")
 
     def clean_output_folder(self):
         log.warning(f"This action will remove the contents of {self.output_folder}")
-        for root, dirs, files in self.output_folder.walk(top_down=False):
-            for name in files:
-                (root / name).unlink()
-            for name in dirs:
-                (root / name).rmdir()
+        # The folder itself is kept, only its entries are removed
+        with os.scandir(self.output_folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+
+
+class ThreadedStacIO(DefaultStacIO):
+    """
+    StacIO writing its files from a thread pool, as saving a catalog made of
+    thousands of small items mostly waits on the file system.
+
+    Only local files can be written. Use it as a context manager: leaving the block
+    waits for all the pending writes and raises the first one that failed, unless
+    the block itself raised.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        super().__init__()
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._futures: list[Future] = []
+
+    def __enter__(self) -> "ThreadedStacIO":
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _, not_done = wait(self._futures, return_when=FIRST_EXCEPTION)
+        for future in not_done:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+        futures, self._futures = self._futures, []
+        # An error raised within the block takes precedence over the write errors
+        if exc_type is None:
+            for future in futures:
+                if not future.cancelled():
+                    future.result()
+
+    def json_dumps(self, json_dict: dict, *_, **__) -> str:
+        # numpy scalars and arrays coming from the dataframes are written as is
+        return orjson.dumps(
+            json_dict,
+            option=orjson.OPT_INDENT_2
+            | orjson.OPT_SERIALIZE_NUMPY
+            | orjson.OPT_NAIVE_UTC,
+        ).decode("utf-8")
+
+    @staticmethod
+    def _write_file(href: str, txt: str):
+        path = Path(href)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(txt, encoding="utf-8")
+
+    def write_text_to_href(self, href: str, txt: str):
+        if self._executor is None:
+            raise RuntimeError("ThreadedStacIO must be used as a context manager")
+        self._futures.append(self._executor.submit(self._write_file, href, txt))
@@ -2,13 +2,14 @@ import re
 from pathlib import Path
 from typing import Literal
 
+import numpy as np
 import pandas as pd
 import pyproj
 from rich.console import Console
 from rich.panel import Panel
 
 from src.downloader import WktDownloader
-from src.instrument import Nomad
+from src.instrument import NOMAD_BANDS
 from src.io import IoHandler
 from src.processing import CatalogCreator, RawDataAnalysis
 
@@ -21,7 +22,7 @@ def create_stac_catalog(
     input_folder: Path | None = None,
     output_folder: Path | None = None,
 ):
-    bands = [Nomad().bands[target_band] for target_band in target_bands]
+    bands = [NOMAD_BANDS[target_band] for target_band in target_bands]
 
     catalog_creator = CatalogCreator(
         catalog_id=catalog_id,
@@ -39,7 +40,7 @@ def download_from_file(file_name: str, output_folder: Path | None = None):
 
 
 def format_data_for_analysis(
-    file_name: str, fmt: Literal["shp", "geosjon", "gpkg", "other"]
+    file_name: str, fmt: Literal["shp", "geosjon", "gpkg", "parquet", "other"]
 ):
     """
     ie. "lno_10_days.shp", "shp"
@@ -69,13 +70,17 @@ def show_wkt_projections(
         df = df[df["solar_body"].str.contains(solar_body, flags=re.IGNORECASE)]
 
     if proj_keywords:
-        df = df[
-            df["projection_name"].str.contains(
-                "".join([f"(?=.*{kw})" for kw in proj_keywords]),
-                regex=True,
-                flags=re.IGNORECASE,
-            )
-        ]
+        # All the keywords must be found, in any order
+        projection_names = df["projection_name"].astype("string[pyarrow]")
+        mask = np.logical_and.reduce(
+            [
+                projection_names.str.contains(
+                    kw, case=False, regex=False, na=False
+                ).to_numpy(dtype=bool)
+                for kw in proj_keywords
+            ]
+        )
+        df = df[mask]
 
     console = Console()
     for row in df.itertuples():
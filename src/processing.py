@@ -1,26 +1,63 @@
-import json
+import os
 import time
-from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import Literal, NamedTuple
+from typing import Literal
 
 import geopandas as gpd
 import pandas as pd
+import pyarrow as pa
 import pyogrio
 import pystac
 from pystac.extensions.eo import Band, EOExtension
 from pystac.extensions.projection import ProjectionExtension
 from rich.console import Console
 from rich.table import Table
-from shapely import bounds, to_geojson
-from tqdm.rich import tqdm
+from shapely import bounds, total_bounds
+from tqdm.auto import tqdm
 
-from src.io import IoHandler
+from src.io import IoHandler, ThreadedStacIO
 from src.settings import DEFAULT_DATA_FOLDER, create_logger
 from src.stac_extra.ssys_extension import SolSysExtension, SolSysTargetClass
 
 log = create_logger(__name__)
 
+# Metadata shared by all the collections and items of the catalog
+COLLECTION_DESCRIPTION = "Nomad LNO Samples over 2018"
+COLLECTION_LICENSE = "CC-BY-SA-4.0"
+PLATFORM = "exomars-trace-gas-orbiter"
+CONSTELLATION = "exomars"
+MISSION = "ExoMars"
+# "Mars (2015) / Ographic / Albers Equal Area", its WKT2 is in wkt_summary.csv
+MARS_CRS_CODE = "IAU:2015:49986"
+
+# Use these properties as a throwaway (not recommended)
+# If you can find related extensions, use them
+# Place anything that doesn't fit in an extension
+ITEM_PROPERTIES = [
+    "incidence_angle",
+    "emergence_angle",
+    "phase_angle",
+    "centre_latitude",
+    "centre_longitude",
+    "channel_temperature",
+]
+
+# Arrow-backed dtypes of the numerical columns of the raw data
+ARROW_DTYPES = {
+    "spec_ix": "int32[pyarrow]",
+    "martian_year": "int32[pyarrow]",
+    "incidence_angle": "double[pyarrow]",
+    "emergence_angle": "double[pyarrow]",
+    "phase_angle": "double[pyarrow]",
+    "centre_latitude": "double[pyarrow]",
+    "centre_longitude": "double[pyarrow]",
+    "channel_temperature": "double[pyarrow]",
+    "ls": "double[pyarrow]",
+    "local_solar_time": "double[pyarrow]",
+}
+
 
 class RawDataAnalysis:
     """
@@ -36,26 +73,36 @@ class RawDataAnalysis:
         self.io_handler = IoHandler(folder, dest_folder)
 
     @staticmethod
-    def read_geojson(fn: Path) -> gpd.GeoDataFrame:
+    def read_geojson(fn: Path) -> pa.Table:
         """
-        Reads a GeoJSON file and converts it in a Geopandas GeoDataFrame.
+        Reads a GeoJSON file as an Arrow table, geometries being kept as WKB.
+
+        The tables are meant to be converted in a GeoDataFrame all at once in
+        `folder_as_geopandas`, timestamps included.
         """
-        gdf = gpd.read_file(fn)
-        gdf["utc_start_time"] = gdf["utc_start_time"].apply(pd.to_datetime)
-        gdf["utc_end_time"] = gdf["utc_end_time"].apply(pd.to_datetime)
-        gdf["file_name"] = fn.stem
-        return gdf
+        _, table = pyogrio.read_arrow(fn)
+        return table.append_column("file_name", pa.repeat(fn.stem, table.num_rows))
 
     def folder_as_geopandas(self) -> gpd.GeoDataFrame:
         """Converts the folder in Geopandas Dataframe"""
         try:
-            file_iterator = chain(
-                self.io_handler.all_input_files_from_ext("geojson"),
-                self.io_handler.all_input_files_from_ext("json"),
+            files = list(self.io_handler.all_input_files_from_exts("geojson", "json"))
+            log.info(f"Converting {len(files)} files")
+            # pyogrio releases the GIL while reading, so threads overlap the I/O
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                tables = list(executor.map(self.read_geojson, files))
+            # Missing columns are filled with nulls, and column types guessed differently
+            # by GDAL across files (eg. int32 vs double) are widened to a common type
+            table = pa.concat_tables(tables, promote_options="permissive")
+            df = gpd.GeoDataFrame.from_arrow(table).rename_geometry("geometry")
+            for col in ["utc_start_time", "utc_end_time"]:
+                df[col] = pd.to_datetime(
+                    df[col], format="ISO8601", utc=True, cache=True
+                )
+            # Only the columns present in the files are cast
+            return df.astype(
+                {col: dtype for col, dtype in ARROW_DTYPES.items() if col in df}
             )
-            log.info("Converting files")
-            _dfs = [self.read_geojson(_fn) for _fn in file_iterator]
-            return pd.concat(_dfs)
         except Exception as e:
             log.error(
                 f"Couldn't parse {self.io_handler.input_folder} as unified GeoDataFrame"
@@ -84,10 +131,17 @@ class RawDataAnalysis:
     def save_to_format(
         self,
         filename: str,
-        fmt_name: Literal["shp", "geosjon", "gpkg", "other"] = "other",
+        fmt_name: Literal["shp", "geosjon", "gpkg", "parquet", "other"] = "other",
+        gdf: gpd.GeoDataFrame | None = None,
     ) -> gpd.GeoDataFrame:
+        """
+        Saves the data in `filename`, in the output folder.
+
+        An already built `gdf` can be given to avoid reading the raw folder again.
+        """
         output_file = self.io_handler.output_folder / filename
-        gdf = self.folder_as_geopandas()
+        if gdf is None:
+            gdf = self.folder_as_geopandas()
 
         if fmt_name in ["shp", "other"]:
             gdf.to_file(output_file)
@@ -95,6 +149,9 @@ class RawDataAnalysis:
             gdf.to_file(output_file, driver="GeoJSON")
         elif fmt_name == "geopackage":
             gdf.to_file(output_file, layer="data", driver="GPKG")
+        elif fmt_name == "parquet":
+            # GeoParquet keeps the dtypes, timezone-aware datetimes included
+            gdf.to_parquet(output_file)
 
         return gdf
 
@@ -125,19 +182,13 @@ class CatalogCreator:
     ) -> pystac.Collection:
         # Create collection
         spatial_extent = pystac.SpatialExtent(
-            bboxes=[df_slice.geometry.total_bounds.tolist()]
+            bboxes=[total_bounds(df_slice.geometry.values).tolist()]
         )
         temporal_extent = pystac.TemporalExtent(
             intervals=[
                 [
-                    df_slice.utc_start_time.sort_values()
-                    .head(1)
-                    .item()
-                    .to_pydatetime(),
-                    df_slice.utc_end_time.sort_values(ascending=False)
-                    .head(1)
-                    .item()
-                    .to_pydatetime(),
+                    df_slice.utc_start_time.min().to_pydatetime(),
+                    df_slice.utc_end_time.max().to_pydatetime(),
                 ]
             ]
         )
@@ -146,9 +197,9 @@ class CatalogCreator:
         )
         return pystac.Collection(
             id=collection_id,
-            description="Nomad LNO Samples over 2018",
+            description=COLLECTION_DESCRIPTION,
             extent=collection_extent,
-            license="CC-BY-SA-4.0",
+            license=COLLECTION_LICENSE,
         )
 
     def create_catalog(
@@ -173,7 +224,7 @@ class CatalogCreator:
 
         catalog = pystac.Catalog(id=self.catalog_id, description=self.catalog_descr)
 
-        df = self.analyzer.save_to_format("lno_10_days.csv", fmt_name="csv")
+        df = self.analyzer.folder_as_geopandas()
 
         # Create main collection
         collection = self.create_collection_from_slice(df, collection_id="10-days-lno")
@@ -188,29 +239,62 @@ class CatalogCreator:
 
         # .. And Projection extension
         proj = ProjectionExtension.summaries(collection, add_if_missing=True)
-        # proj.apply(wkt2=pyproj.CRS(default_wkt).to_wkt())
-        proj.epsg = "IAU:2015:49986"
+        proj.code = [MARS_CRS_CODE]
+
+        # find local time on mars, for all the items at once
+        df["mars_local_time"] = (
+            df["martian_year"].astype(str)
+            + ":"
+            + df["ls"].astype(str)
+            + ":"
+            + df["local_solar_time"].astype(str)
+        )
 
         # Divide by orbit number
-        for diff_order in df["diffraction_order"].unique():
-            sliced_df = df[df["diffraction_order"] == diff_order]
+        df["diffraction_order"] = df["diffraction_order"].astype("category")
+        for diff_order, sliced_df in df.groupby(
+            "diffraction_order", sort=False, observed=True
+        ):
             sub_collection = self.create_collection_from_slice(
                 sliced_df, collection_id=f"diffraction-order-{diff_order}"
             )
 
             subrows, _ = sliced_df.shape
 
+            # Extract every column needed by the items for the whole slice at once
+            geometries = sliced_df.geometry.values
+            item_ids = (
+                sliced_df.file_name + "_" + sliced_df.spec_ix.astype(str)
+            ).tolist()
+            footprints = [geom.__geo_interface__ for geom in geometries]
+            bboxes = bounds(geometries).tolist()
+            start_datetimes = sliced_df.utc_start_time.array.to_pydatetime()
+            end_datetimes = sliced_df.utc_end_time.array.to_pydatetime()
+            properties = sliced_df[ITEM_PROPERTIES].to_dict(orient="records")
+            hdf5_filenames = sliced_df.hdf5_filename.tolist()
+            local_times = sliced_df.mars_local_time.tolist()
+
             # Save it for sub-collections
-            for row in tqdm(
-                sliced_df.itertuples(),
-                total=subrows,
-                desc=f"Collection (DF={diff_order})",
-            ):
-                item = self.gpd_line_to_item(row)
-                item = self.add_asset(item, row)
-                item = self.add_extensions(item, row)
-                sub_collection.add_item(item)
+            items = [
+                self.build_item(*columns)
+                for columns in tqdm(
+                    zip(
+                        item_ids,
+                        footprints,
+                        bboxes,
+                        start_datetimes,
+                        end_datetimes,
+                        properties,
+                        hdf5_filenames,
+                        local_times,
+                    ),
+                    total=subrows,
+                    desc=f"Collection (DF={diff_order})",
+                )
+            ]
 
+            # Links are only set once all the items are built
+            sub_collection.add_items(items)
             collection.add_child(sub_collection)
             log.info(
                 f"Sub-collection {sub_collection.id} added to master collection {collection.id}!"
@@ -227,10 +311,16 @@ class CatalogCreator:
         log.info(
             f"""Saving catalog as {"self-contained" if self_contained else "absolute published"}"""
         )
-        if self_contained:
-            catalog.save(catalog_type=pystac.CatalogType.SELF_CONTAINED)
-        else:
-            catalog.save(catalog_type=pystac.CatalogType.ABSOLUTE_PUBLISHED)
+        with ThreadedStacIO() as stac_io:
+            if self_contained:
+                catalog.save(
+                    catalog_type=pystac.CatalogType.SELF_CONTAINED, stac_io=stac_io
+                )
+            else:
+                catalog.save(
+                    catalog_type=pystac.CatalogType.ABSOLUTE_PUBLISHED,
+                    stac_io=stac_io,
+                )
 
         exec_time = time.time() - start_time
         log.info(
@@ -240,30 +330,23 @@ class CatalogCreator:
         return catalog
 
     @staticmethod
-    def gpd_line_to_item(df_line: NamedTuple) -> pystac.Item:
-        """
-        Converts a line from a geopandas dataframe into a pystac item, while taking account
-        of the arrangement of said line.
+    def build_item(
+        item_id: str,
+        footprint: dict,
+        bbox: list[float],
+        start_datetime_utc: datetime,
+        end_datetime_utc: datetime,
+        properties: dict,
+        hdf5_filename: str,
+        mars_local_time: str,
+    ) -> pystac.Item:
         """
-        item_id = f"{df_line.file_name}_{df_line.spec_ix}"
-        _line_geom = df_line.geometry
-        footprint = json.loads(to_geojson(_line_geom))
-        bbox = bounds(_line_geom).tolist()
-        start_datetime_utc = df_line.utc_start_time.to_pydatetime()
-        end_datetime_utc = df_line.utc_end_time.to_pydatetime()
-
-        # Use this object as a throwaway (not recommended)
-        # If you can find related extensions, use them
-        properties = {}
-
-        # Place anything that doesn't fit in an extension
-        properties["incidence_angle"] = df_line.incidence_angle
-        properties["emergence_angle"] = df_line.emergence_angle
-        properties["phase_angle"] = df_line.phase_angle
-        properties["centre_latitude"] = df_line.centre_latitude
-        properties["centre_longitude"] = df_line.centre_longitude
-        properties["channel_temperature"] = df_line.channel_temperature
+        Builds a complete pystac item (asset and extensions included) from the values
+        of a line of the geopandas dataframe.
 
+        The values are expected to be already extracted and converted, as it is much
+        cheaper to do so for a whole dataframe than line by line.
+        """
         item = pystac.Item(
             id=item_id,
             geometry=footprint,
@@ -275,46 +358,23 @@ class CatalogCreator:
         )
 
         # Add common metadata here
-        item.common_metadata.platform = "exomars-trace-gas-orbiter"
-        item.common_metadata.instruments = ["nomad"]
-        item.common_metadata.constellation = "exomars"
-
-        return item
+        item.common_metadata.platform = PLATFORM
+        item.common_metadata.instruments = ["NOMAD"]
+        item.common_metadata.constellation = CONSTELLATION
+        item.common_metadata.mission = MISSION
 
-    @staticmethod
-    def add_asset(item: pystac.Item, data_row: NamedTuple) -> pystac.Item:
-        """
-        Takes an item and adds assets like imgs or data onto it
-        """
+        # Add the data file as asset
         item.add_asset(
             key="dataformat",
-            asset=pystac.Asset(
-                href=data_row.hdf5_filename, media_type=pystac.MediaType.HDF5
-            ),
+            asset=pystac.Asset(href=hdf5_filename, media_type=pystac.MediaType.HDF5),
         )
-        return item
 
-    def add_extensions(self, item: pystac.Item, data_row: NamedTuple) -> pystac.Item:
-        """
-        Calls the extensions and add them on the current pystac item
-        """
         # Adding SSYS extension
-        ssys = SolSysExtension.ext(item, add_if_missing=True)
-
-        # find local time on mars
-        mars_local_time = (
-            f"{data_row.martian_year}:{data_row.ls}:{data_row.local_solar_time}"
-        )
-
-        ssys.apply(
+        # Targets are repeated as STAC browser won't detect at the collection level
+        SolSysExtension.bulk_apply(
+            item,
+            targets=["mars"],
             local_time=mars_local_time,
+            target_class=SolSysTargetClass.PLANET,
         )
-
-        # STAC browser won't detect at the collection level
-        ssys.targets = ["mars"]
-        ssys.target_class = SolSysTargetClass.PLANET
-
-        # Add common metadata here
-        item.common_metadata.mission = "ExoMars"
-        item.common_metadata.instruments = ["NOMAD"]
         return item
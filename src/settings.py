@@ -1,23 +1,35 @@
 import logging
 from pathlib import Path
 
-from rich.logging import RichHandler
-
-LOGGING_FORMAT = "%(message)s"
-LOGGING_LEVEL = "INFO"
+# The plain stream handler adds nothing, so time and level are in the format
+LOGGING_FORMAT = "%(asctime)s %(levelname)-8s %(message)s"
+LOGGING_LEVEL = logging.INFO
 
 
 ROOT_FOLDER = Path(__file__).parents[1]
 DEFAULT_DATA_FOLDER = ROOT_FOLDER / "data"
 DEFAULT_INPUT_FOLDER = DEFAULT_DATA_FOLDER / "raw"
 DEFAULT_OUTPUT_FOLDER = DEFAULT_DATA_FOLDER / "processed"
+DEFAULT_CACHE_FOLDER = Path.home() / ".cache" / "nomad-stac"
 
 
-def create_logger(logger_name: str) -> logging.Logger:
+_configured = False
+
+
+def configure_logging():
+    """Sets up the root logger, only once. Meant to be called by entrypoints."""
+    global _configured
+    if _configured:
+        return
+
     logging.basicConfig(
         level=LOGGING_LEVEL,
         format=LOGGING_FORMAT,
         datefmt="[%X]",
-        handlers=[RichHandler()],
+        handlers=[logging.StreamHandler()],
     )
+    _configured = True
+
+
+def create_logger(logger_name: str) -> logging.Logger:
     return logging.getLogger(logger_name)
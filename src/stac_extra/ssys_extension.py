@@ -82,6 +82,37 @@ class SolSysExtension(
         self.local_time = local_time
         self.target_class = target_class
 
+    @classmethod
+    def bulk_apply(
+        cls,
+        item: pystac.Item,
+        targets: list[str] | None = None,
+        local_time: str | None = None,
+        target_class: SolSysTargetClass | None = None,
+    ):
+        """Same as :meth:`apply`, but writes straight into the properties of the
+        :class:`~pystac.Item` instead of going through the property setters.
+        Meant for building many items in a row.
+
+        Args:
+            item : The item to extend, the extension schema is added if missing.
+            targets : Array to hold list of target bodies, see :meth:`apply`.
+            local_time: Lexicographically sortable time string (e.g., `01:115:12.343`)
+            target_class: The identity of the type of the target, see :meth:`apply`.
+        """
+        cls.ensure_has_extension(item, add_if_missing=True)
+        properties = item.properties
+        for prop_name, value in (
+            (TARGETS_PROPS, targets),
+            (LOCAL_TIME_PROPS, local_time),
+            (TARGET_CLASS_PROPS, target_class),
+        ):
+            # Same as `pop_if_none` in the setters
+            if value is None:
+                properties.pop(prop_name, None)
+            else:
+                properties[prop_name] = value
+
     @property
     def targets(self) -> list[str] | None:
         """Allows to have one or more targets listed within an array of strings.